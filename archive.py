@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Retention job and cold-tier archive for dashboard_data.
+Moves rows older than each source's retention horizon into zstd-compressed Parquet files
+(archive/source=<name>/date=<YYYY-MM-DD>/) and removes them from PostgreSQL, and reads them back.
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+import db
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # only needed to write or read the archive
+    pa = None
+
+# Where archived rows go; one directory per source, then one per day
+ARCHIVE_DIR = Path(os.getenv('DASHBOARD_ARCHIVE_DIR', Path(__file__).resolve().parent / 'archive'))
+# Days of rows kept in PostgreSQL for sources without their own retention_days
+DEFAULT_RETENTION_DAYS = int(os.getenv('DASHBOARD_RETENTION_DAYS', 90))
+ARCHIVE_CHUNK_ROWS = 50000  # rows read from PostgreSQL per query while archiving
+ARCHIVE_COMPRESSION = 'zstd'
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The archive needs pyarrow: pip install pyarrow")
+
+def source_archive_dir(source_name, archive_dir=ARCHIVE_DIR):
+    """Directory holding the archived rows of one source (the name is URL-encoded, like Hive partitions)"""
+    return Path(archive_dir) / f"source={quote(source_name, safe='')}"
+
+def get_retention_days(conn, source_name):
+    """Retention horizon of a source in days: its own retention_days, or the default"""
+    days = conn.execute(text("""
+        SELECT retention_days FROM data_source_metadata WHERE source_name = :source_name
+    """), {'source_name': source_name}).scalar()
+    return days if days is not None else DEFAULT_RETENTION_DAYS
+
+def set_retention_days(source_name, days):
+    """Store a source's retention horizon; None goes back to the default"""
+    with db.engine.connect() as conn:
+        conn.execute(text("""
+            INSERT INTO data_source_metadata (source_name, retention_days) VALUES (:source_name, :days)
+            ON CONFLICT (source_name) DO UPDATE SET retention_days = EXCLUDED.retention_days
+        """), {'source_name': source_name, 'days': days})
+        conn.commit()
+
+def iter_expired_rows(conn, source_name, cutoff, chunk_rows=ARCHIVE_CHUNK_ROWS):
+    """Rows of a source older than cutoff, oldest first, as DataFrames of at most chunk_rows rows"""
+    query = text("""
+        SELECT id, record_timestamp, record_data::text AS record_data
+        FROM dashboard_data
+        WHERE data_source = :source_name AND record_timestamp < :cutoff
+          AND (record_timestamp, id) > (:after_timestamp, :after_id)
+        ORDER BY record_timestamp, id
+        LIMIT :limit
+    """)
+    after = (datetime.min, 0)
+    while True:
+        rows = conn.execute(query, {
+            'source_name': source_name, 'cutoff': cutoff,
+            'after_timestamp': after[0], 'after_id': after[1], 'limit': chunk_rows
+        }).fetchall()
+        if not rows:
+            return
+        frame = pd.DataFrame(rows, columns=['id', 'record_timestamp', 'record_data'])
+        yield frame
+        after = (rows[-1].record_timestamp, rows[-1].id)
+
+def day_part_ids(day_dir, known=None):
+    """Ids held by each part file of a day directory, as {path: sorted ids}, cached in known[day_dir]"""
+    if known is None:
+        known = {}
+    if day_dir not in known:
+        known[day_dir] = {path: np.sort(pq.read_table(path, columns=['id']).column('id').to_numpy())
+                          for path in sorted(day_dir.glob('part-*.parquet'))}
+    return known[day_dir]
+
+def write_archive_chunk(frame, source_dir, known=None):
+    """Write a chunk of rows into per-day Parquet files, returning the number of files written
+
+    Files are named by their first and last id. A run that follows an interrupted one reads
+    the same rows again: earlier part files whose ids the new rows all cover are replaced,
+    and rows already in the day's other part files are left out, so no row is archived twice.
+    known caches the ids of each day's part files across the chunks of a run (day_part_ids).
+    """
+    _require_pyarrow()
+    if known is None:
+        known = {}
+    files = 0
+    for day, rows in frame.groupby(frame['record_timestamp'].dt.strftime('%Y-%m-%d'), sort=False):
+        day_dir = source_dir / f"date={day}"
+        day_dir.mkdir(parents=True, exist_ok=True)
+        parts = day_part_ids(day_dir, known)
+        ids = rows['id'].to_numpy()
+        superseded = [path for path, part in parts.items() if np.isin(part, ids).all()]
+        kept = [part for path, part in parts.items() if path not in superseded]
+        if kept:
+            rows = rows[~np.isin(ids, np.concatenate(kept))]
+        if rows.empty:
+            continue
+
+        path = day_dir / f"part-{rows['id'].iloc[0]}-{rows['id'].iloc[-1]}.parquet"
+        # Written aside and moved into place, so a crash never leaves a truncated part file
+        temporary = day_dir / f"_{path.name}"
+        pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), temporary, compression=ARCHIVE_COMPRESSION)
+        os.replace(temporary, path)
+        for old in superseded:
+            if old != path:
+                old.unlink()
+            del parts[old]
+        parts[path] = np.sort(rows['id'].to_numpy())
+        files += 1
+    return files
+
+def expired_partitions(conn, source_name, cutoff):
+    """Monthly partitions of a source that only hold rows timestamped before cutoff (none if unpartitioned)"""
+    if not db.is_partitioned(conn):
+        return []
+    names = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits AS i JOIN pg_class AS child ON child.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(dashboard_partition_table(:source_name))
+    """), {'source_name': source_name}).scalars().all()
+    expired = []
+    for name in names:
+        month_start = datetime.strptime(name[-6:], '%Y%m')
+        if month_start + pd.DateOffset(months=1) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+def archive_source(source_name, retention_days=None, archive_dir=ARCHIVE_DIR, dry_run=False):
+    """Archive and remove the rows of one source that are older than its retention horizon
+
+    Returns the number of rows archived. Only the ids written to Parquet are removed. An expired
+    monthly partition holding exactly the rows archived from its month is dropped rather than
+    deleted from, so it leaves no dead tuples or index bloat behind.
+    """
+    with db.engine.connect() as conn:
+        if retention_days is None:
+            retention_days = get_retention_days(conn, source_name)
+        # Database time, the clock record_timestamp was set by
+        cutoff = conn.execute(text("SELECT CURRENT_TIMESTAMP::timestamp - make_interval(days => :days)"),
+                              {'days': int(retention_days)}).scalar()
+
+        if dry_run:
+            expired = conn.execute(text("""
+                SELECT COUNT(*) FROM dashboard_data WHERE data_source = :source_name AND record_timestamp < :cutoff
+            """), {'source_name': source_name, 'cutoff': cutoff}).scalar()
+            print(f"{source_name}: {expired} rows older than {cutoff:%Y-%m-%d %H:%M} ({retention_days} days)")
+            return expired
+
+        # Parquet first; rows only leave PostgreSQL once they are on disk
+        source_dir = source_archive_dir(source_name, archive_dir)
+        archived = files = 0
+        known = {}  # ids of each day's part files
+        written_ids = []  # ids of each chunk, all on disk
+        month_rows = {}  # rows archived per YYYYMM
+        for frame in iter_expired_rows(conn, source_name, cutoff):
+            files += write_archive_chunk(frame, source_dir, known)
+            archived += len(frame)
+            written_ids.append(frame['id'].tolist())
+            for month, count in frame['record_timestamp'].dt.strftime('%Y%m').value_counts().items():
+                month_rows[month] = month_rows.get(month, 0) + int(count)
+        conn.commit()
+        if archived == 0:
+            print(f"{source_name}: nothing older than {retention_days} days")
+            return 0
+
+        # Rows that became visible after they were read aren't in Parquet and stay for the next run
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        for partition in expired_partitions(conn, source_name, cutoff):
+            conn.execute(text(f'LOCK TABLE "{partition}" IN ACCESS EXCLUSIVE MODE'))
+            count = conn.execute(text(f'SELECT COUNT(*) FROM "{partition}"')).scalar()
+            if count == month_rows.get(partition[-6:], 0):
+                conn.execute(text(f'DROP TABLE "{partition}"'))
+        for ids in written_ids:
+            conn.execute(text("""
+                DELETE FROM dashboard_data WHERE data_source = :source_name AND id = ANY(CAST(:ids AS bigint[]))
+            """), {'source_name': source_name, 'ids': ids})
+        conn.commit()
+
+    print(f"{source_name}: archived {archived} rows older than {cutoff:%Y-%m-%d %H:%M} into {files} files")
+    return archived
+
+def read_archive(source_name, start_date=None, end_date=None, limit=None, archive_dir=ARCHIVE_DIR):
+    """Archived rows of a source between two dates (inclusive) as id, record_timestamp, record_data
+
+    Oldest first; with a limit, the first limit rows by (record_timestamp, id).
+    """
+    _require_pyarrow()
+    columns = ['id', 'record_timestamp', 'record_data']
+    source_dir = source_archive_dir(source_name, archive_dir)
+    if not source_dir.exists():
+        return pd.DataFrame(columns=columns)
+
+    # Only the day directories inside the range are opened, oldest first until the limit is reached
+    start = pd.Timestamp(start_date).strftime('%Y-%m-%d') if start_date is not None else None
+    end = pd.Timestamp(end_date).strftime('%Y-%m-%d') if end_date is not None else None
+    days = sorted(path for path in source_dir.glob('date=*') if path.is_dir()
+                  and (start is None or path.name[5:] >= start) and (end is None or path.name[5:] <= end))
+    frames = []
+    rows = 0
+    for day_dir in days:
+        frame = ds.dataset(day_dir, format='parquet').to_table(columns=columns).to_pandas()
+        frames.append(frame)
+        rows += len(frame)
+        if limit is not None and rows >= limit:
+            break
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    archived = pd.concat(frames, ignore_index=True).sort_values(['record_timestamp', 'id'], ignore_index=True)
+    return archived.head(limit) if limit is not None else archived
+
+def archived_sources(archive_dir=ARCHIVE_DIR):
+    """Names of the sources with archived rows"""
+    if not Path(archive_dir).exists():
+        return []
+    return sorted(unquote(path.name.split('=', 1)[1]) for path in Path(archive_dir).glob('source=*') if path.is_dir())
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Move dashboard rows past their retention horizon into Parquet files.")
+    parser.add_argument('sources', nargs='*', help="Sources to archive (default: every source)")
+    parser.add_argument('--days', type=int, default=None,
+                        help=f"Retention horizon for this run instead of each source's own "
+                             f"(sources without one keep {DEFAULT_RETENTION_DAYS} days)")
+    parser.add_argument('--set-retention', type=int, metavar='DAYS', default=None,
+                        help="Store DAYS as the retention horizon of the given sources and exit")
+    parser.add_argument('--archive-dir', type=Path, default=ARCHIVE_DIR,
+                        help=f"Where Parquet files are written (default: {ARCHIVE_DIR})")
+    parser.add_argument('--dry-run', action='store_true', help="Only count the rows that would be archived")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    print("=== Dashboard Data Retention ===")
+    print()
+
+    args = parse_args(argv)
+    try:
+        db.ensure_tables_exist()
+    except Exception as e:
+        print(f"Database setup error: {e}")
+        return False
+
+    if args.set_retention is not None:
+        if not args.sources:
+            print("Name the sources to set the retention horizon for.")
+            return False
+        for source_name in args.sources:
+            set_retention_days(source_name, args.set_retention)
+            print(f"{source_name}: keeps {args.set_retention} days in PostgreSQL")
+        return True
+
+    if not args.dry_run:
+        _require_pyarrow()
+
+    sources = args.sources or db.get_data_sources()
+    total = 0
+    for source_name in sources:
+        try:
+            total += archive_source(source_name, args.days, args.archive_dir, args.dry_run)
+        except Exception as e:
+            print(f"{source_name}: archiving failed, nothing was removed: {e}")
+
+    print(f"\n{'Would archive' if args.dry_run else 'Archived'} {total} rows from {len(sources)} sources.")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
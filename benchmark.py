@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the importer and the dashboard's data functions.
+Generates a synthetic source, imports it into a throwaway PostgreSQL database, times the
+dashboard queries and writes rows/s, latency percentiles and peak RSS as JSON.
+Each stage runs in its own process so its peak RSS is its own.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+import synthetic_data
+
+DEFAULT_ITERATIONS = 20  # timed calls per dashboard function
+DEFAULT_DASHBOARD_LIMIT = 1000  # rows loaded by load_dashboard_data, the dashboard's default
+DEFAULT_TOLERANCE = 0.2  # allowed slowdown against a baseline before it counts as a regression
+
+def log(message):
+    """Progress goes to stderr so stdout stays machine-readable"""
+    print(message, file=sys.stderr, flush=True)
+
+def latency_summary(seconds):
+    """p50, p99, max and mean of a list of durations, in milliseconds"""
+    ms = np.asarray(seconds, dtype='float64') * 1000
+    if len(ms) == 0:
+        return None
+    return {
+        'p50': round(float(np.percentile(ms, 50)), 3),
+        'p99': round(float(np.percentile(ms, 99)), 3),
+        'max': round(float(ms.max()), 3),
+        'mean': round(float(ms.mean()), 3)
+    }
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+# --- Stages (run in a child process with DATABASE_URL pointing at the benchmark database) ---
+def run_ingest(config):
+    """Import the synthetic file the way data_importer --bulk (or --pipeline) does, timing every batch"""
+    import db
+    from data_importer import iter_data_chunks, iter_prepared_batches, write_frame_batch, pipelined_import
+
+    db.ensure_tables_exist()
+    latencies = []
+    rows = 0
+    start = time.perf_counter()
+    if config.get('pipeline'):
+        # Batches overlap, so only the end-to-end rate is comparable
+        rows = pipelined_import(config['csv_path'], config['source_name'], config['chunk_size'],
+                                config['batch_size'], config['method'])
+    else:
+        chunks = iter_data_chunks(config['csv_path'], config['chunk_size'])
+        for batch, prepared in iter_prepared_batches(config['source_name'], chunks, config['batch_size']):
+            batch_start = time.perf_counter()
+            with db.engine.connect() as conn:
+                write_frame_batch(conn, config['source_name'], batch, config['method'], prepared=prepared)
+                conn.commit()
+            latencies.append(time.perf_counter() - batch_start)
+            rows += len(batch)
+    elapsed = time.perf_counter() - start
+
+    return [{
+        'name': 'ingest.pipeline' if config.get('pipeline') else 'ingest',
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None,
+        'batch_latency_ms': latency_summary(latencies),
+        'peak_rss_mb': peak_rss_mb()
+    }]
+
+def _is_empty(result):
+    if result is None:
+        return True
+    if isinstance(result, tuple):
+        result = result[0]
+    return isinstance(result, pd.DataFrame) and result.empty
+
+def run_dashboard(config):
+    """Time the dashboard's data functions with their caches cleared before every call"""
+    import streamlit as st
+    import dashboard_app as app
+
+    source_name = config['source_name']
+    limit = config['limit']
+    df, metadata = app.load_dashboard_data(source_name, limit)
+    numeric, categorical, _ = app.identify_chart_columns(df, metadata)
+
+    cases = {
+        'load_dashboard_data': lambda: app.load_dashboard_data(source_name, limit),
+        'load_dashboard_data_projected': lambda: app.load_dashboard_data(source_name, limit, columns=numeric[:1]),
+        'identify_chart_columns': lambda: app.identify_chart_columns(df, metadata),
+        'identify_chart_columns_no_metadata': lambda: app.identify_chart_columns(df, {}),
+        'load_raw_page': lambda: app.load_raw_page(source_name, app.RAW_PAGE_SIZES[0]),
+    }
+    if numeric:
+        cases['load_time_series_buckets'] = lambda: app.load_time_series_buckets(source_name, numeric[0])
+        cases['load_rollup_series'] = lambda: app.load_rollup_series(source_name, numeric[0], '24 hours')
+        cases['load_correlation_matrix'] = lambda: app.load_correlation_matrix(source_name, numeric)
+        if categorical:
+            cases['load_category_totals'] = lambda: app.load_category_totals(source_name, categorical[0], numeric[0])
+
+    results = []
+    for name, call in cases.items():
+        timings = []
+        empty = False
+        for _ in range(config['iterations']):
+            st.cache_data.clear()
+            app.clear_frame_cache()
+            start = time.perf_counter()
+            result = call()
+            timings.append(time.perf_counter() - start)
+            empty = empty or _is_empty(result)
+        results.append({
+            'name': f'dashboard.{name}',
+            'iterations': len(timings),
+            'latency_ms': latency_summary(timings),
+            'empty_result': empty,  # the function swallowed an error or found no rows
+            'peak_rss_mb': peak_rss_mb()
+        })
+    return results
+
+STAGES = {'ingest': run_ingest, 'dashboard': run_dashboard}
+
+def run_stage(stage, config, database_url):
+    """Run one stage in a fresh Python process against database_url and return its results"""
+    with tempfile.TemporaryDirectory() as workdir:
+        result_path = Path(workdir) / 'result.json'
+        env = dict(os.environ, DATABASE_URL=database_url)
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--stage', stage,
+                        '--config', json.dumps(config), '--result-file', str(result_path)],
+                       env=env, check=True, stdout=sys.stderr)
+        return json.loads(result_path.read_text())
+
+# --- Throwaway Database ---
+def create_database(admin_url, name):
+    """Create an empty database next to the configured one"""
+    engine = create_engine(admin_url, isolation_level='AUTOCOMMIT')
+    with engine.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+        version = conn.execute(text("SHOW server_version")).scalar()
+    engine.dispose()
+    return version
+
+def drop_database(admin_url, name):
+    engine = create_engine(admin_url, isolation_level='AUTOCOMMIT')
+    with engine.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+    engine.dispose()
+
+def server_version(url):
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        version = conn.execute(text("SHOW server_version")).scalar()
+    engine.dispose()
+    return version
+
+# --- Baseline Comparison ---
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Descriptions of the results that are more than tolerance worse than in a baseline report"""
+    previous = {result['name']: result for result in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result['name'])
+        if old is None:
+            continue
+        if result.get('rows_per_second') and old.get('rows_per_second'):
+            if result['rows_per_second'] < old['rows_per_second'] * (1 - tolerance):
+                regressions.append(f"{result['name']}: {old['rows_per_second']:,.0f} -> "
+                                   f"{result['rows_per_second']:,.0f} rows/s")
+        for key in ('latency_ms', 'batch_latency_ms'):
+            if result.get(key) and old.get(key):
+                if result[key]['p99'] > old[key]['p99'] * (1 + tolerance):
+                    regressions.append(f"{result['name']}: p99 {old[key]['p99']:.1f} -> {result[key]['p99']:.1f} ms")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the importer and dashboard queries on synthetic data.")
+    synthetic_data.add_shape_arguments(parser)
+    parser.add_argument('--batch-size', type=int, default=5000, help="Rows per import transaction (default: 5000)")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="Rows read from the file at a time (default: 100000)")
+    parser.add_argument('--method', choices=('copy', 'insert'), default='copy', help="Bulk write method (default: copy)")
+    parser.add_argument('--pipeline', action='store_true', help="Import with data_importer's pipelined mode")
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS,
+                        help=f"Timed calls per dashboard function (default: {DEFAULT_ITERATIONS})")
+    parser.add_argument('--limit', type=int, default=DEFAULT_DASHBOARD_LIMIT,
+                        help=f"Rows loaded by load_dashboard_data (default: {DEFAULT_DASHBOARD_LIMIT})")
+    parser.add_argument('--database-url', default=None,
+                        help="Use this existing database instead of creating and dropping a throwaway one")
+    parser.add_argument('--keep-database', action='store_true', help="Don't drop the throwaway database")
+    parser.add_argument('--output', type=Path, default=None, help="Write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', type=Path, default=None,
+                        help="Earlier JSON report; exit with status 1 if anything got worse than --tolerance")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed slowdown against the baseline (default: {DEFAULT_TOLERANCE})")
+    # Internal: run one stage in a child process
+    parser.add_argument('--stage', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.stage:
+        results = STAGES[args.stage](json.loads(args.config))
+        Path(args.result_file).write_text(json.dumps(results))
+        return 0
+
+    import db
+    run_id = uuid.uuid4().hex[:8]
+    admin_url = make_url(db.build_url())
+    database_name = f"dashboard_bench_{run_id}"
+    shape = synthetic_data.shape_from_args(args)
+    config = {
+        'source_name': f"benchmark_{run_id}",
+        'rows': args.rows,
+        'shape': shape,
+        'seed': args.seed,
+        'batch_size': args.batch_size,
+        'chunk_size': args.chunk_size,
+        'method': args.method,
+        'pipeline': args.pipeline,
+        'iterations': args.iterations,
+        'limit': args.limit
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        config['csv_path'] = str(Path(workdir) / 'benchmark.csv')
+        log(f"Generating {args.rows} synthetic rows...")
+        synthetic_data.write_synthetic_csv(config['csv_path'], args.rows, args.seed, **shape)
+
+        if args.database_url:
+            database_url = args.database_url
+            version = server_version(database_url)
+        else:
+            log(f"Creating throwaway database {database_name}...")
+            version = create_database(admin_url, database_name)
+            database_url = admin_url.set(database=database_name).render_as_string(hide_password=False)
+
+        try:
+            log("Running ingest benchmark...")
+            results = run_stage('ingest', config, database_url)
+            log("Running dashboard benchmark...")
+            results += run_stage('dashboard', config, database_url)
+        finally:
+            if not args.database_url and not args.keep_database:
+                drop_database(admin_url, database_name)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': {key: value for key, value in config.items() if key != 'csv_path'},
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'postgres': version
+        },
+        'results': results
+    }
+    if args.baseline:
+        report['regressions'] = find_regressions(results, json.loads(args.baseline.read_text()), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + '\n')
+        log(f"Report written to {args.output}")
+    else:
+        print(output)
+
+    for regression in report.get('regressions', []):
+        log(f"REGRESSION {regression}")
+    return 1 if report.get('regressions') else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,27 +4,96 @@
 -- Create database (run manually if needed)
 -- CREATE DATABASE data_dashboard;
 
--- Main data table with flexible schema
+-- Main data table with flexible schema, partitioned by source and then by month so each
+-- source's queries, indexes and vacuum only touch its own partitions (see migrate_partitions.py
+-- to convert a table created before partitioning)
 CREATE TABLE IF NOT EXISTS dashboard_data (
-    id SERIAL PRIMARY KEY,
-    record_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    data_source VARCHAR(255),  -- Original filename/source
-    record_data JSONB  -- Store all columns as JSON for maximum flexibility
-);
+    id BIGSERIAL,
+    record_timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    data_source VARCHAR(255) NOT NULL,  -- Original filename/source
+    record_data JSONB,  -- Store all columns as JSON for maximum flexibility
+    PRIMARY KEY (data_source, record_timestamp, id)
+) PARTITION BY LIST (data_source);
+
+-- Name of a source's partition; its monthly partitions add a _YYYYMM suffix
+CREATE OR REPLACE FUNCTION dashboard_partition_table(source_name TEXT)
+RETURNS TEXT AS $$
+    SELECT 'dashboard_data_' || left(regexp_replace(lower(source_name), '[^a-z0-9]+', '_', 'g'), 24)
+           || '_' || left(md5(source_name), 8)
+$$ LANGUAGE sql IMMUTABLE;
 
--- Index for performance
+-- Create the partition of one source and month if missing; the importers call this before writing.
+-- Does nothing while dashboard_data is still a plain table.
+CREATE OR REPLACE FUNCTION ensure_dashboard_partition(source_name TEXT, for_time TIMESTAMP)
+RETURNS VOID AS $$
+DECLARE
+    source_table TEXT := dashboard_partition_table(source_name);
+    month_start TIMESTAMP := date_trunc('month', for_time);
+    month_table TEXT := source_table || '_' || to_char(month_start, 'YYYYMM');
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'dashboard_data'::regclass) <> 'p'
+       OR to_regclass(month_table) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    -- Concurrent importers create partitions one at a time
+    PERFORM pg_advisory_xact_lock(hashtext('dashboard_data_partitions'));
+    IF to_regclass(source_table) IS NULL THEN
+        EXECUTE format('CREATE TABLE %I PARTITION OF dashboard_data FOR VALUES IN (%L) PARTITION BY RANGE (record_timestamp)',
+                       source_table, source_name);
+    END IF;
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                   month_table, source_table, month_start, month_start + INTERVAL '1 month');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Index for performance (created on every partition)
 CREATE INDEX IF NOT EXISTS idx_dashboard_data_timestamp ON dashboard_data(record_timestamp);
-CREATE INDEX IF NOT EXISTS idx_dashboard_data_source ON dashboard_data(data_source);
 CREATE INDEX IF NOT EXISTS idx_dashboard_data_jsonb ON dashboard_data USING GIN(record_data);
+-- Backs incremental dashboard refreshes (rows with id above the last one seen)
+CREATE INDEX IF NOT EXISTS idx_dashboard_data_source_id ON dashboard_data(data_source, id);
+-- Backs keyset pagination of the raw data browser (newest first within a source);
+-- the partitioned table's primary key already has this order
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'dashboard_data'::regclass) = 'r' THEN
+        CREATE INDEX IF NOT EXISTS idx_dashboard_data_source_ts_id ON dashboard_data(data_source, record_timestamp, id);
+    END IF;
+END;
+$$;
 
 -- Table to store column metadata for each data source
 CREATE TABLE IF NOT EXISTS data_source_metadata (
     id SERIAL PRIMARY KEY,
     source_name VARCHAR(255) UNIQUE NOT NULL,
-    column_info JSONB,  -- Store column names, types, and display preferences
+    column_info JSONB,  -- Store column names, types, and display preferences (rebuilt from column_stats per import chunk)
+    column_stats JSONB,  -- Running per-column statistics (counts, min/max/sum, top and sample values), merged per import chunk
+    column_moments JSONB,  -- Running covariance accumulators of the numeric columns, merged per import chunk
+    column_sketches JSONB,  -- HyperLogLog distinct-count sketch per column, merged per import chunk
+    retention_days INTEGER,  -- Days of rows kept before archive.py moves them to Parquet, NULL for the default
+    datetime_formats JSONB,  -- Datetime formats the dashboard detected in sources without importer metadata
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+-- Databases created before column_stats and column_moments existed
+ALTER TABLE data_source_metadata ADD COLUMN IF NOT EXISTS column_stats JSONB;
+ALTER TABLE data_source_metadata ADD COLUMN IF NOT EXISTS column_moments JSONB;
+ALTER TABLE data_source_metadata ADD COLUMN IF NOT EXISTS column_sketches JSONB;
+ALTER TABLE data_source_metadata ADD COLUMN IF NOT EXISTS retention_days INTEGER;
+ALTER TABLE data_source_metadata ADD COLUMN IF NOT EXISTS datetime_formats JSONB;
+
+-- Per-source minute/hour/day aggregates of each numeric column, maintained by the importers
+-- as batches land so long time windows don't have to scan raw JSON rows
+CREATE TABLE IF NOT EXISTS dashboard_rollups (
+    data_source VARCHAR(255) NOT NULL,
+    granularity VARCHAR(10) NOT NULL,  -- 'minute', 'hour' or 'day'
+    bucket_start TIMESTAMP NOT NULL,
+    column_name TEXT NOT NULL,  -- Key in record_data
+    value_count BIGINT NOT NULL,
+    value_sum DOUBLE PRECISION NOT NULL,
+    value_min DOUBLE PRECISION,
+    value_max DOUBLE PRECISION,
+    PRIMARY KEY (data_source, granularity, column_name, bucket_start)
+);
 
 -- Function to update the updated_at timestamp
 CREATE OR REPLACE FUNCTION update_modified_column()
@@ -40,6 +109,30 @@ CREATE TRIGGER update_metadata_modtime
     BEFORE UPDATE ON data_source_metadata 
     FOR EACH ROW EXECUTE FUNCTION update_modified_column();
 
+-- Notify listening dashboards once per statement for each data source that received rows
+CREATE OR REPLACE FUNCTION notify_dashboard_data_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('dashboard_data_changed', changed.data_source)
+    FROM (SELECT DISTINCT data_source FROM new_rows WHERE data_source IS NOT NULL) AS changed;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'dashboard_data_notify' AND tgrelid = 'dashboard_data'::regclass
+    ) THEN
+        CREATE TRIGGER dashboard_data_notify
+            AFTER INSERT ON dashboard_data
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_dashboard_data_insert();
+    END IF;
+END;
+$$;
+
 -- View to get the most recent data for dashboard display
 CREATE OR REPLACE VIEW latest_dashboard_data AS
 SELECT 
@@ -51,40 +144,33 @@ FROM dashboard_data
 ORDER BY record_timestamp DESC
 LIMIT 1000;
 
--- Function to get column statistics for a data source
-CREATE OR REPLACE FUNCTION get_column_stats(source_name TEXT)
+-- Column statistics of a data source, read from the metadata the importers maintain per chunk
+-- (one row per column, no scan of dashboard_data; distinct_values is a HyperLogLog estimate)
+DROP FUNCTION IF EXISTS get_column_stats(TEXT);
+CREATE FUNCTION get_column_stats(source_name TEXT)
 RETURNS TABLE(
     column_name TEXT,
     data_type TEXT,
     distinct_values BIGINT,
     null_count BIGINT,
-    sample_values TEXT[]
+    sample_values TEXT[],
+    min_value DOUBLE PRECISION,
+    max_value DOUBLE PRECISION,
+    mean_value DOUBLE PRECISION
 ) AS $$
-BEGIN
-    RETURN QUERY
-    SELECT 
-        keys.key AS column_name,
-        CASE 
-            WHEN jsonb_typeof(values.value) = 'number' THEN 'numeric'
-            WHEN jsonb_typeof(values.value) = 'boolean' THEN 'boolean'
-            ELSE 'text'
-        END AS data_type,
-        COUNT(DISTINCT values.value) AS distinct_values,
-        COUNT(*) FILTER (WHERE values.value = 'null'::jsonb) AS null_count,
-        ARRAY(
-            SELECT DISTINCT values.value::text 
-            FROM dashboard_data d2, jsonb_each(d2.record_data) AS vals(k, v)
-            WHERE d2.data_source = source_name AND vals.k = keys.key
-            LIMIT 5
-        ) AS sample_values
-    FROM dashboard_data d, 
-         jsonb_object_keys(d.record_data) AS keys(key),
-         jsonb_each(d.record_data) AS values(k, value)
-    WHERE d.data_source = source_name 
-          AND keys.key = values.k
-    GROUP BY keys.key, jsonb_typeof(values.value);
-END;
-$$ LANGUAGE plpgsql;
+    SELECT
+        info.key,
+        info.value->>'data_type',
+        (info.value->>'unique_values')::BIGINT,
+        (info.value->>'null_count')::BIGINT,
+        ARRAY(SELECT jsonb_array_elements_text(COALESCE(info.value->'sample_values', '[]'::jsonb))),
+        (info.value->>'min_value')::DOUBLE PRECISION,
+        (info.value->>'max_value')::DOUBLE PRECISION,
+        (info.value->>'mean_value')::DOUBLE PRECISION
+    FROM data_source_metadata m, jsonb_each(m.column_info) AS info
+    WHERE m.source_name = get_column_stats.source_name
+    ORDER BY info.key;
+$$ LANGUAGE sql STABLE;
 
 -- Drop old sales-specific table if it exists (optional - uncomment if needed)
 -- DROP TABLE IF EXISTS sales_data;
\ No newline at end of file
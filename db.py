@@ -0,0 +1,347 @@
+"""
+Shared database access for the dashboards, importers and setup scripts.
+Builds one pooled engine per process from config.py or environment variables
+and holds the schema and queries every entry point needs.
+"""
+
+import os
+import json
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL
+
+# Connection details: config.py if present (see config_template.py), otherwise the template defaults.
+# DB_HOST, DB_PORT, DB_USER, DB_PASSWORD and DB_NAME override single values, DATABASE_URL overrides them all.
+try:
+    from config import DATABASE_CONFIG
+except ImportError:
+    DATABASE_CONFIG = {
+        'host': 'localhost',
+        'port': '5432',
+        'username': 'postgres',
+        'password': 'your_password',
+        'database': 'data_dashboard'
+    }
+
+ENV_OVERRIDES = {
+    'host': 'DB_HOST',
+    'port': 'DB_PORT',
+    'username': 'DB_USER',
+    'password': 'DB_PASSWORD',
+    'database': 'DB_NAME'
+}
+
+# psycopg2 (the default, from requirements.txt) or psycopg for psycopg 3
+DB_DRIVER = os.getenv('DB_DRIVER', 'psycopg2')
+
+# Pool sizing: Streamlit serves every session from one process, so this caps the dashboard's
+# connections at POOL_SIZE + MAX_OVERFLOW no matter how many browsers are open
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))  # seconds to wait for a free connection
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # seconds before a connection is replaced
+
+# Server-side limit for a single statement, 0 disables it
+STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+
+# psycopg 3 only: prepare a query server-side after it has run this many times on a connection
+PREPARE_THRESHOLD = int(os.getenv('DB_PREPARE_THRESHOLD', 5))
+
+def build_url(**overrides):
+    """Connection URL from DATABASE_CONFIG, environment variables and explicit overrides"""
+    if os.getenv('DATABASE_URL') and not overrides:
+        return os.getenv('DATABASE_URL')
+
+    settings = dict(DATABASE_CONFIG)
+    for key, env_var in ENV_OVERRIDES.items():
+        if os.getenv(env_var):
+            settings[key] = os.getenv(env_var)
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+
+    # URL.create escapes special characters in the password
+    return URL.create(
+        f"postgresql+{DB_DRIVER}",
+        username=settings['username'],
+        password=settings['password'] or None,
+        host=settings['host'],
+        port=int(settings['port']) if settings['port'] else None,
+        database=settings['database']
+    )
+
+def create_db_engine(url=None, statement_timeout_ms=STATEMENT_TIMEOUT_MS, **engine_options):
+    """Pooled engine with pre-ping, a statement timeout and (on psycopg 3) server-side prepared statements"""
+    connect_args = {}
+    if statement_timeout_ms:
+        connect_args['options'] = f"-c statement_timeout={int(statement_timeout_ms)}"
+    if DB_DRIVER == 'psycopg' and PREPARE_THRESHOLD > 0:
+        connect_args['prepare_threshold'] = PREPARE_THRESHOLD
+
+    options = {
+        'pool_size': POOL_SIZE,
+        'max_overflow': MAX_OVERFLOW,
+        'pool_timeout': POOL_TIMEOUT,
+        'pool_recycle': POOL_RECYCLE,
+        'pool_pre_ping': True,  # drop connections the server closed instead of failing the next query
+        'connect_args': connect_args
+    }
+    options.update(engine_options)
+    return create_engine(url or build_url(), **options)
+
+# One engine per process; importing modules share its pool
+engine = create_db_engine()
+
+# --- Schema ---
+# Partitioned by source, then by month, so each source's queries, indexes and vacuum only touch its own
+# partitions. Databases created before partitioning keep a plain table until migrate_partitions.py runs.
+DASHBOARD_DATA_TABLE = """
+    CREATE TABLE IF NOT EXISTS dashboard_data (
+        id BIGSERIAL,
+        record_timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        data_source VARCHAR(255) NOT NULL,
+        record_data JSONB,
+        PRIMARY KEY (data_source, record_timestamp, id)
+    ) PARTITION BY LIST (data_source)
+"""
+
+# Name of a source's partition; its monthly partitions add a _YYYYMM suffix
+PARTITION_NAME_FUNCTION = """
+    CREATE OR REPLACE FUNCTION dashboard_partition_table(source_name TEXT)
+    RETURNS TEXT AS $$
+        SELECT 'dashboard_data_' || left(regexp_replace(lower(source_name), '[^a-z0-9]+', '_', 'g'), 24)
+               || '_' || left(md5(source_name), 8)
+    $$ LANGUAGE sql IMMUTABLE
+"""
+
+# Creates the partition of one source and month (and the source's partition above it) if missing;
+# does nothing while dashboard_data is still a plain table
+PARTITION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION ensure_dashboard_partition(source_name TEXT, for_time TIMESTAMP)
+    RETURNS VOID AS $$
+    DECLARE
+        source_table TEXT := dashboard_partition_table(source_name);
+        month_start TIMESTAMP := date_trunc('month', for_time);
+        month_table TEXT := source_table || '_' || to_char(month_start, 'YYYYMM');
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = 'dashboard_data'::regclass) <> 'p'
+           OR to_regclass(month_table) IS NOT NULL THEN
+            RETURN;
+        END IF;
+        -- Concurrent importers create partitions one at a time
+        PERFORM pg_advisory_xact_lock(hashtext('dashboard_data_partitions'));
+        IF to_regclass(source_table) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I PARTITION OF dashboard_data FOR VALUES IN (%L) PARTITION BY RANGE (record_timestamp)',
+                           source_table, source_name);
+        END IF;
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                       month_table, source_table, month_start, month_start + INTERVAL '1 month');
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+SCHEMA_STATEMENTS = [
+    DASHBOARD_DATA_TABLE,
+    PARTITION_NAME_FUNCTION,
+    PARTITION_FUNCTION,
+    """
+    CREATE TABLE IF NOT EXISTS data_source_metadata (
+        id SERIAL PRIMARY KEY,
+        source_name VARCHAR(255) UNIQUE NOT NULL,
+        column_info JSONB,
+        column_stats JSONB,
+        column_moments JSONB,
+        column_sketches JSONB,
+        retention_days INTEGER,
+        datetime_formats JSONB,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Running per-column statistics that column_info is rebuilt from (see data_importer.update_source_stats)
+    "ALTER TABLE data_source_metadata ADD COLUMN IF NOT EXISTS column_stats JSONB",
+    # Running covariance accumulators of the numeric columns (see streaming_stats.py)
+    "ALTER TABLE data_source_metadata ADD COLUMN IF NOT EXISTS column_moments JSONB",
+    # HyperLogLog distinct-count sketch per column, base64 encoded (see streaming_stats.py)
+    "ALTER TABLE data_source_metadata ADD COLUMN IF NOT EXISTS column_sketches JSONB",
+    # Days of rows kept before archive.py moves them to Parquet, NULL for the default
+    "ALTER TABLE data_source_metadata ADD COLUMN IF NOT EXISTS retention_days INTEGER",
+    # Datetime formats the dashboard detected itself; kept apart so column_info stays the importer's
+    "ALTER TABLE data_source_metadata ADD COLUMN IF NOT EXISTS datetime_formats JSONB",
+    # On a partitioned table these are created on every partition, so each stays proportional to its source
+    "CREATE INDEX IF NOT EXISTS idx_dashboard_data_timestamp ON dashboard_data(record_timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_dashboard_data_jsonb ON dashboard_data USING GIN(record_data)",
+    "CREATE INDEX IF NOT EXISTS idx_dashboard_data_source_id ON dashboard_data(data_source, id)",
+    # The partitioned table's primary key already has this order
+    """
+    DO $$
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = 'dashboard_data'::regclass) = 'r' THEN
+            CREATE INDEX IF NOT EXISTS idx_dashboard_data_source_ts_id
+                ON dashboard_data(data_source, record_timestamp, id);
+        END IF;
+    END;
+    $$
+    """,
+    # Per-source minute/hour/day aggregates of numeric columns, maintained at ingest
+    """
+    CREATE TABLE IF NOT EXISTS dashboard_rollups (
+        data_source VARCHAR(255) NOT NULL,
+        granularity VARCHAR(10) NOT NULL,
+        bucket_start TIMESTAMP NOT NULL,
+        column_name TEXT NOT NULL,
+        value_count BIGINT NOT NULL,
+        value_sum DOUBLE PRECISION NOT NULL,
+        value_min DOUBLE PRECISION,
+        value_max DOUBLE PRECISION,
+        PRIMARY KEY (data_source, granularity, column_name, bucket_start)
+    )
+    """,
+    # Notify listening dashboards when a source receives rows
+    """
+    CREATE OR REPLACE FUNCTION notify_dashboard_data_insert()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM pg_notify('dashboard_data_changed', changed.data_source)
+        FROM (SELECT DISTINCT data_source FROM new_rows WHERE data_source IS NOT NULL) AS changed;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_trigger
+            WHERE tgname = 'dashboard_data_notify' AND tgrelid = 'dashboard_data'::regclass
+        ) THEN
+            CREATE TRIGGER dashboard_data_notify
+                AFTER INSERT ON dashboard_data
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION notify_dashboard_data_insert();
+        END IF;
+    END;
+    $$
+    """
+]
+
+def ensure_tables_exist():
+    """Create the tables, indexes and triggers the dashboard needs if they don't exist"""
+    with engine.connect() as conn:
+        # Building an index on a large existing table outlasts the pool's statement timeout
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        for statement in SCHEMA_STATEMENTS:
+            conn.execute(text(statement))
+        conn.commit()
+
+# --- Partitions ---
+# How often an ingesting process re-checks its source's partitions. Each check also creates the
+# partition an hour ahead, so a month boundary is always covered before rows arrive for it.
+PARTITION_CHECK_SECONDS = 300
+PARTITION_LEAD = '1 hour'
+_partition_checks = {}  # source name -> time.monotonic() of its last check
+
+def ensure_partition(source_name):
+    """Create the dashboard_data partitions that rows of source_name inserted now will land in"""
+    last_check = _partition_checks.get(source_name)
+    if last_check is not None and time.monotonic() - last_check < PARTITION_CHECK_SECONDS:
+        return
+    # Own short transaction: creating a partition briefly locks dashboard_data
+    with engine.connect() as conn:
+        conn.execute(text(f"""
+            SELECT ensure_dashboard_partition(:source_name, CURRENT_TIMESTAMP::timestamp),
+                   ensure_dashboard_partition(:source_name, CURRENT_TIMESTAMP::timestamp + INTERVAL '{PARTITION_LEAD}')
+        """), {'source_name': source_name})
+        conn.commit()
+    _partition_checks[source_name] = time.monotonic()
+
+def is_partitioned(conn):
+    """Whether dashboard_data is the partitioned table rather than a plain one"""
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('dashboard_data')")).scalar()
+    return relkind == 'p'
+
+# --- Common Queries ---
+def get_data_sources():
+    """Names of all data sources with rows in dashboard_data"""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT DISTINCT data_source FROM dashboard_data ORDER BY data_source")).fetchall()
+    return [row[0] for row in rows]
+
+def get_column_metadata(source_name):
+    """column_info stored for a data source, or an empty dict"""
+    query = text("SELECT column_info FROM data_source_metadata WHERE source_name = :source_name")
+    with engine.connect() as conn:
+        result = conn.execute(query, {'source_name': source_name}).fetchone()
+    if result:
+        metadata = result[0]
+        if isinstance(metadata, str):
+            return json.loads(metadata)
+        elif isinstance(metadata, dict):
+            return metadata
+    return {}
+
+def get_column_stats(source_name):
+    """One row of statistics per column of a data source, from its stored column_info"""
+    return [
+        {
+            'column_name': name,
+            'data_type': info.get('data_type'),
+            'distinct_values': info.get('unique_values'),
+            'null_count': info.get('null_count', info.get('total_rows', 0) - info.get('non_null_rows', 0)),
+            'sample_values': info.get('sample_values', []),
+            'min_value': info.get('min_value'),
+            'max_value': info.get('max_value'),
+            'mean_value': info.get('mean_value')
+        }
+        for name, info in sorted(get_column_metadata(source_name).items())
+    ]
+
+def get_column_moments(source_name):
+    """Stored covariance accumulators of a data source as plain JSON, or None"""
+    query = text("SELECT column_moments FROM data_source_metadata WHERE source_name = :source_name")
+    with engine.connect() as conn:
+        moments = conn.execute(query, {'source_name': source_name}).scalar()
+    return json.loads(moments) if isinstance(moments, str) else moments
+
+def get_column_sketches(source_name):
+    """Stored distinct-count sketches of a data source ({column: base64 registers}), or an empty dict"""
+    query = text("SELECT column_sketches FROM data_source_metadata WHERE source_name = :source_name")
+    with engine.connect() as conn:
+        sketches = conn.execute(query, {'source_name': source_name}).scalar()
+    return (json.loads(sketches) if isinstance(sketches, str) else sketches) or {}
+
+def get_datetime_formats(source_name):
+    """Datetime formats the dashboard detected for a data source ({column: format}), or an empty dict"""
+    query = text("SELECT datetime_formats FROM data_source_metadata WHERE source_name = :source_name")
+    with engine.connect() as conn:
+        formats = conn.execute(query, {'source_name': source_name}).scalar()
+    return (json.loads(formats) if isinstance(formats, str) else formats) or {}
+
+def store_column_metadata(source_name, column_info):
+    """Insert or replace the column metadata of a data source, returning True if it was new"""
+    upsert_query = text("""
+        INSERT INTO data_source_metadata (source_name, column_info)
+        VALUES (:source_name, :column_info)
+        ON CONFLICT (source_name) DO UPDATE
+        SET column_info = EXCLUDED.column_info, updated_at = CURRENT_TIMESTAMP
+        RETURNING (xmax = 0) AS inserted
+    """)
+    with engine.connect() as conn:
+        inserted = conn.execute(upsert_query, {
+            'source_name': source_name,
+            'column_info': json.dumps(column_info)
+        }).scalar()
+        conn.commit()
+    return bool(inserted)
+
+def copy_from_buffer(conn, copy_sql, buffer):
+    """Run a COPY ... FROM STDIN statement on either psycopg2 or psycopg 3"""
+    cursor = conn.connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            # psycopg2
+            cursor.copy_expert(copy_sql, buffer)
+        else:
+            # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
@@ -0,0 +1,64 @@
+"""
+Downsampling helpers for the dashboard's line charts.
+Reduces a series to a fixed number of points while keeping its visual shape.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Points sent to the browser for one time series line
+DEFAULT_POINT_BUDGET = 1000
+
+def lttb_indices(x, y, n_out=DEFAULT_POINT_BUDGET):
+    """Return the indices kept by Largest-Triangle-Three-Buckets downsampling
+
+    x must be sorted. The first and last points are always kept; every bucket in
+    between keeps the point forming the largest triangle with its neighbours,
+    which preserves peaks and troughs.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+
+    # n_out - 2 buckets spread over every point except the first and last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+
+    return indices
+
+def lttb_downsample(df, x_col, y_col, n_out=DEFAULT_POINT_BUDGET):
+    """Downsample a DataFrame sorted by x_col to at most n_out rows with LTTB"""
+    if len(df) <= n_out:
+        return df
+    x = df[x_col]
+    if pd.api.types.is_datetime64_any_dtype(x.dtype):
+        x = x.astype('int64')
+    return df.iloc[lttb_indices(x.to_numpy(), df[y_col].to_numpy(), n_out)]
+
+def interleave_min_max(buckets, time_col, min_col, max_col, first_col, last_col):
+    """Turn per-bucket min/max rows (sorted by bucket) into a line: each bucket's low, then its high"""
+    times = np.column_stack([buckets[first_col].to_numpy(), buckets[last_col].to_numpy()]).ravel()
+    values = np.column_stack([buckets[min_col].to_numpy(), buckets[max_col].to_numpy()]).ravel()
+    return pd.DataFrame({time_col: times, 'value': values})
@@ -0,0 +1,168 @@
+"""
+Ingest metrics for the importers.
+Counts rows, parsed bytes, failures, batch latency and read-to-commit lag per data source,
+serves them in the Prometheus text format on a local port and prints a periodic summary line.
+"""
+
+import os
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Port of the /metrics endpoint (0 disables it) and the interface it listens on
+METRICS_PORT = int(os.getenv('DASHBOARD_METRICS_PORT', 0))
+METRICS_HOST = os.getenv('DASHBOARD_METRICS_HOST', '127.0.0.1')
+SUMMARY_INTERVAL_SECONDS = 10  # seconds between summary lines, 0 disables them
+
+# Histogram bucket upper bounds in seconds
+BATCH_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LAG_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+_lock = threading.Lock()
+_sources = {}  # data source -> its metrics
+
+def _new_histogram(buckets):
+    return {'buckets': buckets, 'counts': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+
+def _observe(histogram, value):
+    histogram['counts'][bisect.bisect_left(histogram['buckets'], value)] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+def _source(source_name):
+    if source_name not in _sources:
+        _sources[source_name] = {
+            'rows': 0,
+            'bytes': 0,
+            'failed': 0,
+            'batch_seconds': _new_histogram(BATCH_LATENCY_BUCKETS),
+            'lag_seconds': _new_histogram(LAG_BUCKETS),
+            'last_lag': None,
+            'summarized': (0, 0, 0.0, time.monotonic())  # rows, batches, batch seconds and time at the last summary
+        }
+    return _sources[source_name]
+
+# --- Recording ---
+def record_parsed(source_name, byte_count):
+    """Bytes of input file read and parsed for a source"""
+    with _lock:
+        _source(source_name)['bytes'] += int(byte_count)
+
+def record_batch(source_name, rows, seconds, read_at=None):
+    """A committed batch: its rows, how long writing and committing took, and when its rows were read (time.time())"""
+    with _lock:
+        metrics = _source(source_name)
+        metrics['rows'] += rows
+        _observe(metrics['batch_seconds'], seconds)
+        if read_at is not None:
+            lag = max(time.time() - read_at, 0.0)
+            _observe(metrics['lag_seconds'], lag)
+            metrics['last_lag'] = lag
+
+def record_failure(source_name, rows):
+    """Rows that could not be written"""
+    with _lock:
+        _source(source_name)['failed'] += rows
+
+# --- Prometheus Text Format ---
+def _label(source_name):
+    escaped = source_name.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'data_source="{escaped}"'
+
+def _histogram_lines(name, label, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram['buckets'], histogram['counts']):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram["count"]}')
+    lines.append(f'{name}_sum{{{label}}} {histogram["sum"]}')
+    lines.append(f'{name}_count{{{label}}} {histogram["count"]}')
+    return lines
+
+def render_prometheus():
+    """Every metric in the Prometheus text exposition format"""
+    with _lock:
+        snapshot = {name: {key: (dict(value, counts=list(value['counts'])) if isinstance(value, dict) else value)
+                           for key, value in metrics.items()}
+                    for name, metrics in _sources.items()}
+
+    counters = (
+        ('dashboard_ingest_rows_total', 'rows', "Rows committed to dashboard_data."),
+        ('dashboard_ingest_bytes_parsed_total', 'bytes', "Bytes of input files read and parsed."),
+        ('dashboard_ingest_failed_rows_total', 'failed', "Rows that could not be written."),
+    )
+    lines = []
+    for name, key, help_text in counters:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        lines += [f"{name}{{{_label(source)}}} {metrics[key]}" for source, metrics in sorted(snapshot.items())]
+
+    histograms = (
+        ('dashboard_ingest_batch_seconds', 'batch_seconds', "Time to write and commit one batch."),
+        ('dashboard_ingest_lag_seconds', 'lag_seconds', "Time from reading rows from the file to committing them."),
+    )
+    for name, key, help_text in histograms:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for source, metrics in sorted(snapshot.items()):
+            lines += _histogram_lines(name, _label(source), metrics[key])
+
+    lines += ["# HELP dashboard_ingest_last_lag_seconds Read-to-commit lag of the latest batch.",
+              "# TYPE dashboard_ingest_last_lag_seconds gauge"]
+    lines += [f"dashboard_ingest_last_lag_seconds{{{_label(source)}}} {metrics['last_lag']}"
+              for source, metrics in sorted(snapshot.items()) if metrics['last_lag'] is not None]
+    return '\n'.join(lines) + '\n'
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes would drown out the importer's own output
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics from a background thread; returns the server, or None when port is 0"""
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# --- Summary Line ---
+def summary_line():
+    """One line per source with rows/s, batch latency and lag since the previous summary, or None"""
+    now = time.monotonic()
+    parts = []
+    with _lock:
+        for source_name, metrics in sorted(_sources.items()):
+            rows, batches, seconds, since = metrics['summarized']
+            histogram = metrics['batch_seconds']
+            new_batches = histogram['count'] - batches
+            rate = (metrics['rows'] - rows) / (now - since) if now > since else 0
+            latency = (histogram['sum'] - seconds) / new_batches * 1000 if new_batches else 0
+            lag = f", lag {metrics['last_lag']:.1f}s" if metrics['last_lag'] is not None else ""
+            parts.append(f"{source_name}: {metrics['rows']:,} rows ({rate:,.0f}/s), "
+                         f"{metrics['bytes'] / (1024 * 1024):,.1f} MB parsed, {metrics['failed']:,} failed, "
+                         f"batch avg {latency:,.0f} ms{lag}")
+            metrics['summarized'] = (metrics['rows'], histogram['count'], histogram['sum'], now)
+    return "📈 " + " | ".join(parts) if parts else None
+
+def start_summary_thread(interval=SUMMARY_INTERVAL_SECONDS, output=print):
+    """Print summary_line() every interval seconds until the returned event is set"""
+    stop = threading.Event()
+    if interval and interval > 0:
+        def run():
+            while not stop.wait(interval):
+                line = summary_line()
+                if line:
+                    output(line)
+        threading.Thread(target=run, daemon=True).start()
+    return stop
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Partition Migration Script for Universal Data Dashboard
+Converts a dashboard_data table created before partitioning into the table partitioned by
+source and month. The old table is kept as dashboard_data_unpartitioned unless --drop-old is given.
+"""
+
+import sys
+import argparse
+from sqlalchemy import text
+import db
+
+OLD_TABLE = 'dashboard_data_unpartitioned'
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Partition dashboard_data by data source and month.")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Show the partitions and row counts, then roll back")
+    parser.add_argument('--drop-old', action='store_true',
+                        help=f"Drop {OLD_TABLE} once its rows are copied")
+    parser.add_argument('-y', '--yes', action='store_true', help="Skip the confirmation prompt")
+    return parser.parse_args(argv)
+
+def rename_old_indexes(conn):
+    """Move the old table's index names out of the way so the new table can reuse them"""
+    index_names = conn.execute(text("""
+        SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = CAST(:table AS regclass)
+    """), {'table': OLD_TABLE}).scalars().all()
+    for name in index_names:
+        conn.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name[:48]}_unpartitioned"'))
+
+def migrate(conn, drop_old=False):
+    """Copy every row of the plain dashboard_data into a partitioned one, in the caller's transaction"""
+    # Writers wait until the migration commits instead of inserting into the old table
+    conn.execute(text("LOCK TABLE dashboard_data IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text(f"ALTER TABLE dashboard_data RENAME TO {OLD_TABLE}"))
+    rename_old_indexes(conn)
+
+    conn.execute(text(db.DASHBOARD_DATA_TABLE))
+    conn.execute(text(db.PARTITION_NAME_FUNCTION))
+    conn.execute(text(db.PARTITION_FUNCTION))
+
+    partitions = conn.execute(text(f"""
+        SELECT data_source, date_trunc('month', record_timestamp) AS month, COUNT(*) AS row_count
+        FROM {OLD_TABLE}
+        WHERE data_source IS NOT NULL AND record_timestamp IS NOT NULL
+        GROUP BY 1, 2 ORDER BY 1, 2
+    """)).fetchall()
+    for source_name, month, row_count in partitions:
+        conn.execute(text("SELECT ensure_dashboard_partition(:source_name, :month)"),
+                     {'source_name': source_name, 'month': month})
+        print(f"✓ Partition {source_name} {month:%Y-%m}: {row_count} rows")
+
+    # One statement per source keeps each copy inside a single list partition
+    for source_name in sorted({row.data_source for row in partitions}):
+        copied = conn.execute(text(f"""
+            INSERT INTO dashboard_data (id, record_timestamp, data_source, record_data)
+            SELECT id, record_timestamp, data_source, record_data FROM {OLD_TABLE}
+            WHERE data_source = :source_name AND record_timestamp IS NOT NULL
+        """), {'source_name': source_name}).rowcount
+        print(f"✓ Copied {copied} rows of {source_name}")
+
+    conn.execute(text(f"""
+        SELECT setval(pg_get_serial_sequence('dashboard_data', 'id'),
+                      (SELECT COALESCE(MAX(id), 0) + 1 FROM {OLD_TABLE}), false)
+    """))
+
+    # Indexes are built after the copy, then the notify trigger is attached to the new table
+    for statement in db.SCHEMA_STATEMENTS:
+        conn.execute(text(statement))
+
+    # The view still points at the old table
+    if conn.execute(text("SELECT to_regclass('latest_dashboard_data')")).scalar():
+        conn.execute(text("""
+            CREATE OR REPLACE VIEW latest_dashboard_data AS
+            SELECT id, record_timestamp, data_source, record_data
+            FROM dashboard_data
+            ORDER BY record_timestamp DESC
+            LIMIT 1000
+        """))
+
+    # Rows without a source or timestamp have no partition to go to
+    left_behind = conn.execute(text(f"""
+        SELECT COUNT(*) FROM {OLD_TABLE} WHERE data_source IS NULL OR record_timestamp IS NULL
+    """)).scalar()
+    if left_behind:
+        print(f"⚠ {left_behind} rows without a data source or timestamp were not copied")
+
+    if drop_old:
+        conn.execute(text(f"DROP TABLE {OLD_TABLE}"))
+        print(f"✓ Dropped {OLD_TABLE}")
+    return left_behind
+
+def main(argv=None):
+    print("=== Universal Data Dashboard Partition Migration ===")
+    print()
+
+    args = parse_args(argv)
+    # Copying a large table can run long, so no statement timeout here
+    engine = db.create_db_engine(statement_timeout_ms=0)
+
+    try:
+        with engine.connect() as conn:
+            if db.is_partitioned(conn):
+                print("dashboard_data is already partitioned, nothing to do.")
+                return True
+            if conn.execute(text("SELECT to_regclass('dashboard_data')")).scalar() is None:
+                print("dashboard_data does not exist; run setup_database.py to create the partitioned table.")
+                return False
+            if conn.execute(text(f"SELECT to_regclass('{OLD_TABLE}')")).scalar() is not None:
+                print(f"{OLD_TABLE} already exists from an earlier migration; drop or rename it first.")
+                return False
+
+            if not args.yes and not args.dry_run:
+                confirm = input("\nThis locks dashboard_data while every row is copied. Continue? (y/N): ").strip().lower()
+                if confirm != 'y':
+                    print("Operation cancelled.")
+                    return False
+
+            migrate(conn, drop_old=args.drop_old)
+            if args.dry_run:
+                conn.rollback()
+                print("\nDry run: rolled back, nothing was changed.")
+                return True
+            conn.commit()
+
+        print("\n✅ dashboard_data is now partitioned by data source and month.")
+        if not args.drop_old:
+            print(f"The old rows are kept in {OLD_TABLE}; drop it once you have checked the dashboard.")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Migration failed, nothing was changed: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
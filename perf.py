@@ -0,0 +1,111 @@
+"""
+Lightweight timing of the dashboard's hot path.
+Stages are timed with a context manager or decorator, collected per rerun for the
+Performance panel and emitted as structured (one JSON object per line) logs.
+"""
+
+import os
+import json
+import time
+import logging
+import functools
+import contextvars
+from contextlib import contextmanager
+
+# INFO logs one line per rerun with every stage, DEBUG also one line per stage,
+# WARNING turns the timing logs off
+LOG_LEVEL = os.getenv('DASHBOARD_PERF_LOG', 'INFO').upper()
+
+logger = logging.getLogger('dashboard.perf')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+# Per thread (Streamlit runs each session's rerun in its own thread)
+_run = contextvars.ContextVar('perf_run', default=None)  # stages of the current rerun
+_open = contextvars.ContextVar('perf_open', default=())  # stages being timed, innermost last
+_computing = contextvars.ContextVar('perf_computing', default=None)  # set when a cached function body runs
+
+def _log(level, record):
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps(record, default=str))
+
+def start_run():
+    """Start collecting the stages of one rerun"""
+    _run.set({'stages': [], 'started': time.perf_counter()})
+
+def finish_run(**fields):
+    """Stop collecting, log the rerun and return (total ms, stages in the order they started)"""
+    run = _run.get()
+    if run is None:
+        return 0.0, []
+    _run.set(None)
+    total_ms = round((time.perf_counter() - run['started']) * 1000, 3)
+    _log(logging.INFO, {'event': 'rerun', 'ms': total_ms, **fields, 'stages': run['stages']})
+    return total_ms, run['stages']
+
+@contextmanager
+def stage(name, **fields):
+    """Time the enclosed block as one stage; extra fields (e.g. cache='hit') are logged with it"""
+    open_stages = _open.get()
+    record = {'stage': name, 'depth': len(open_stages), **fields}
+    run = _run.get()
+    if run is not None:
+        run['stages'].append(record)
+    token = _open.set(open_stages + (record,))
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['ms'] = round((time.perf_counter() - start) * 1000, 3)
+        _open.reset(token)
+        _log(logging.DEBUG, {'event': 'stage', **record})
+
+def annotate(**fields):
+    """Add fields to the innermost stage being timed, if any"""
+    open_stages = _open.get()
+    if open_stages:
+        open_stages[-1].update(fields)
+
+def timed(name=None):
+    """Decorator timing every call of a function as a stage (named after the function by default)"""
+    def decorate(func):
+        stage_name = name or func.__name__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def cached(cache_decorator, name=None):
+    """Apply a Streamlit cache decorator, e.g. cached(st.cache_data(ttl=30)), timing each call as a hit or miss
+
+    The function body only runs on a miss, so a call during which it didn't run was served from the cache.
+    """
+    def decorate(func):
+        stage_name = name or func.__name__
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            ran = _computing.get()
+            if ran is not None:
+                ran.append(True)
+            return func(*args, **kwargs)
+        cached_func = cache_decorator(compute)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _computing.set([])
+            try:
+                with stage(stage_name) as record:
+                    result = cached_func(*args, **kwargs)
+                    record['cache'] = 'miss' if _computing.get() else 'hit'
+            finally:
+                _computing.reset(token)
+            return result
+        wrapper.clear = cached_func.clear
+        return wrapper
+    return decorate
@@ -6,7 +6,34 @@ This script creates the necessary database structure for the universal dashboard
 
 import os
 import sys
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+import db
+
+def split_sql_statements(sql_script):
+    """Split a SQL script on semicolons, keeping $$-quoted function bodies and comments intact"""
+    statements = []
+    current = []
+    in_dollar_quote = False
+    
+    for line in sql_script.splitlines():
+        stripped = line.strip()
+        if not in_dollar_quote and (stripped.startswith('--') or not stripped):
+            continue
+        current.append(line)
+        if line.count('$$') % 2 == 1:
+            in_dollar_quote = not in_dollar_quote
+        code = stripped.split('--')[0].rstrip()  # ignore trailing comments
+        if not in_dollar_quote and code.endswith(';'):
+            statement = '\n'.join(current).strip().rstrip(';').strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    
+    trailing = '\n'.join(current).strip().rstrip(';').strip()
+    if trailing:
+        statements.append(trailing)
+    return statements
 
 def setup_database():
     """Set up the database with the required schema"""
@@ -14,12 +41,13 @@ def setup_database():
     print("=== Universal Data Dashboard Database Setup ===")
     print()
     
-    # Database connection details
-    default_host = "localhost"
-    default_port = "5432"
-    default_user = "postgres"
+    # Database connection details (defaults from config.py / DB_* environment variables)
+    settings = make_url(db.build_url())
+    default_host = settings.host or "localhost"
+    default_port = str(settings.port or 5432)
+    default_user = settings.username or "postgres"
     default_password = ""  # No default password for security
-    default_database = "data_dashboard"
+    default_database = settings.database or "data_dashboard"
     
     print("Enter your PostgreSQL connection details:")
     host = input(f"Host (default: {default_host}): ").strip() or default_host
@@ -28,12 +56,13 @@ def setup_database():
     password = input(f"Password (default: {default_password}): ").strip() or default_password
     database = input(f"Database name (default: {default_database}): ").strip() or default_database
     
-    # Create connection string
-    connection_string = f"postgresql://{user}:{password}@{host}:{port}/{database}"
-    
     try:
         print(f"\nConnecting to database: {database}")
-        engine = create_engine(connection_string)
+        # Schema changes can run long on existing tables, so no statement timeout here
+        engine = db.create_db_engine(
+            db.build_url(host=host, port=port, username=user, password=password, database=database),
+            statement_timeout_ms=0
+        )
         
         # Read and execute the SQL setup script
         sql_file_path = os.path.join(os.path.dirname(__file__), 'database_setup.sql')
@@ -49,7 +78,7 @@ def setup_database():
         
         with engine.connect() as conn:
             # Split the script into individual statements
-            statements = [stmt.strip() for stmt in sql_script.split(';') if stmt.strip()]
+            statements = split_sql_statements(sql_script)
             
             for statement in statements:
                 if statement:
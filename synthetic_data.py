@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Synthetic data sources for benchmarks and demos.
+Generates CSV files of a chosen shape: row count, mix of numeric, text and datetime columns,
+text cardinality and null fraction. The same arguments and seed always give the same file.
+"""
+
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROWS = 100000
+DEFAULT_CARDINALITY = 50  # distinct values per text column
+WRITE_CHUNK_ROWS = 100000  # rows generated at a time when writing a file
+DATETIME_START = pd.Timestamp('2024-01-01')
+DATETIME_SPAN_SECONDS = 365 * 24 * 3600
+
+def synthetic_frame(rows, numeric_columns=4, text_columns=3, datetime_columns=1,
+                    cardinality=DEFAULT_CARDINALITY, null_fraction=0.0, seed=0):
+    """DataFrame of synthetic columns named num_N, text_N and date_N
+
+    Numeric columns alternate between floats and integers. Text values follow a Zipf-like
+    distribution over `cardinality` categories, so a few values dominate like real data.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+
+    for i in range(numeric_columns):
+        if i % 2 == 0:
+            columns[f'num_{i}'] = rng.normal(100 * (i + 1), 25, rows).round(2)
+        else:
+            columns[f'num_{i}'] = rng.integers(0, 1000, rows)
+
+    weights = 1.0 / np.arange(1, cardinality + 1)
+    weights /= weights.sum()
+    for i in range(text_columns):
+        categories = np.array([f'text_{i}_{k}' for k in range(cardinality)], dtype=object)
+        columns[f'text_{i}'] = categories[rng.choice(cardinality, rows, p=weights)]
+
+    for i in range(datetime_columns):
+        seconds = rng.integers(0, DATETIME_SPAN_SECONDS, rows)
+        columns[f'date_{i}'] = (DATETIME_START + pd.to_timedelta(seconds, unit='s')).strftime('%Y-%m-%d %H:%M:%S')
+
+    df = pd.DataFrame(columns)
+    if null_fraction > 0:
+        df = df.mask(rng.random(df.shape) < null_fraction)
+    return df
+
+def write_synthetic_csv(path, rows=DEFAULT_ROWS, seed=0, chunk_rows=WRITE_CHUNK_ROWS, **shape):
+    """Write a synthetic source to a CSV file chunk by chunk, so memory doesn't grow with rows"""
+    written = 0
+    chunk_index = 0
+    while written < rows or chunk_index == 0:
+        size = min(chunk_rows, rows - written)
+        chunk = synthetic_frame(size, seed=seed + chunk_index, **shape)
+        chunk.to_csv(path, mode='w' if chunk_index == 0 else 'a', header=chunk_index == 0, index=False)
+        written += size
+        chunk_index += 1
+    return written
+
+def add_shape_arguments(parser):
+    """The options describing a synthetic source, shared with benchmark.py"""
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help=f"Rows to generate (default: {DEFAULT_ROWS})")
+    parser.add_argument('--numeric', type=int, default=4, help="Numeric columns (default: 4)")
+    parser.add_argument('--text', type=int, default=3, help="Text columns (default: 3)")
+    parser.add_argument('--datetime', type=int, default=1, help="Datetime columns (default: 1)")
+    parser.add_argument('--cardinality', type=int, default=DEFAULT_CARDINALITY,
+                        help=f"Distinct values per text column (default: {DEFAULT_CARDINALITY})")
+    parser.add_argument('--null-fraction', type=float, default=0.0, help="Share of values left empty (default: 0)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+
+def shape_from_args(args):
+    """Keyword arguments for synthetic_frame / write_synthetic_csv from parsed shape options"""
+    return {
+        'numeric_columns': args.numeric,
+        'text_columns': args.text,
+        'datetime_columns': args.datetime,
+        'cardinality': args.cardinality,
+        'null_fraction': args.null_fraction
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic CSV data source.")
+    parser.add_argument('output', help="CSV file to write")
+    add_shape_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    rows = write_synthetic_csv(args.output, args.rows, args.seed, **shape_from_args(args))
+    print(f"Wrote {rows} rows to {args.output}")
+
+if __name__ == "__main__":
+    sys.exit(main())